@@ -0,0 +1,412 @@
+import subprocess
+import tempfile
+import time
+from collections import namedtuple
+from pathlib import Path
+
+import winsound
+
+import probe
+import processor
+import status
+import verifier
+
+JOINED_SUFFIX = "_joined"
+SKIPPED_NAMES_SHOWN = 5  # 完了メッセージに名前を出す除外クリップの数
+# MP4 にそのままストリームコピーできるコーデックと、形式を揃え直すときのエンコーダー
+VIDEO_ENCODERS = {"h264": "libx264", "hevc": "libx265", "mpeg4": "mpeg4"}
+AUDIO_ENCODERS = {"aac": "aac", "mp3": "libmp3lame", "ac3": "ac3", "eac3": "eac3", "alac": "alac"}
+# ffprobe のプロファイル名 -> エンコーダーの -profile 値。
+# 再エンコードで同じプロファイルを作れないものはコピー先の形式に選ばない
+VIDEO_PROFILES = {
+    "h264": {"Constrained Baseline": "baseline", "Baseline": "baseline", "Main": "main", "High": "high",
+             "High 10": "high10", "High 4:2:2": "high422", "High 4:4:4 Predictive": "high444"},
+    "hevc": {"Main": "main", "Main 10": "main10"},
+    "mpeg4": {"Simple Profile": None},
+}
+AUDIO_PROFILES = {"aac": {"LC": "aac_low"}}  # ここに無いコーデックはプロファイルを問わない
+# MP4 で使えるコーデックタグ（AVI の H264/X264 などはここに無いので既定のタグとみなす）
+MP4_CODEC_TAGS = {"h264": ("avc1", "avc3"), "hevc": ("hvc1", "hev1"), "mpeg4": ("mp4v",)}
+# MP4 へコピーしたときに付くコーデックタグ（mkv などタグの無い入力用）
+DEFAULT_CODEC_TAGS = {"h264": "avc1", "hevc": "hev1", "mpeg4": "mp4v"}
+# パラメータセット（SPS/PPS 等）をキーフレームごとにストリーム内へ持たせるときのタグ
+INBAND_CODEC_TAGS = {"h264": "avc3", "hevc": "hev1", "mpeg4": "mp4v"}
+# コピーできる形式のクリップが1本も無いときに揃える先
+FALLBACK_VIDEO_CODEC = "h264"
+FALLBACK_VIDEO_PROFILE = "High"
+FALLBACK_PIX_FMT = "yuv420p"
+FALLBACK_AUDIO_CODEC = "aac"
+FALLBACK_AUDIO_PROFILE = "LC"
+
+# -c copy で繋げるにはここに挙げた項目がすべて一致している必要がある
+VideoFormat = namedtuple("VideoFormat", "codec profile level tag extradata width height pix_fmt frame_rate sar")
+AudioFormat = namedtuple("AudioFormat", "codec profile sample_rate channels")
+
+
+def is_join_mode(settings):
+    """結合モードが有効か"""
+    return settings.get('join_mode', 'off') == 'on'
+
+
+def collect_jobs(paths):
+    """
+    ドロップされたパスから結合ジョブ [(出力先, クリップ一覧), ...] を作る。
+    フォルダはフォルダごとに1本、個別に指定したファイルはまとめて1本にする。
+    クリップの順番は変換時と同じ自然順（get_valid_files）。
+    """
+    jobs = []
+    loose_files = []
+    for p_str in paths:
+        p = Path(p_str)
+        if p.is_dir():
+            # 前回までの出力フォルダの中身は結合対象にしない
+            clips = [clip for clip in processor.get_valid_files([p])
+                     if processor.OUTPUT_DIR_NAME not in clip.relative_to(p).parts]
+            if clips:
+                jobs.append((p / processor.OUTPUT_DIR_NAME / f"{p.name}{JOINED_SUFFIX}.mp4", clips))
+        else:
+            loose_files.append(p)
+
+    loose_files = processor.get_valid_files(loose_files)
+    if loose_files:
+        first = loose_files[0]
+        jobs.append((first.parent / processor.OUTPUT_DIR_NAME / f"{first.stem}{JOINED_SUFFIX}.mp4", loose_files))
+    return jobs
+
+
+def _normalize_sar(sar):
+    return sar if sar and sar not in ("0:1", "N/A") else "1:1"
+
+
+def _codec_tag(stream):
+    """MP4 に書いたときのコーデックタグ"""
+    codec = stream.get("codec_name")
+    tag = stream.get("codec_tag_string", "")
+    if tag in MP4_CODEC_TAGS.get(codec, ()):
+        return tag
+    return DEFAULT_CODEC_TAGS.get(codec)
+
+
+def _level(stream):
+    level = stream.get("level")
+    return level if isinstance(level, int) and level > 0 else None
+
+
+def clip_signature(info):
+    """
+    ストリームコピーで繋げられるかの判定に使う、映像・音声の形式 (VideoFormat, AudioFormat)。
+    MP4 には先頭クリップのコーデック設定（avcC の SPS/PPS 等）しか入らないので、
+    プロファイル・レベル・タグに加えてコーデック設定そのもの（extradata のハッシュ）まで比べる。
+    """
+    streams = probe.main_streams(info)
+    video = streams.get("video")
+    audio = streams.get("audio")
+    video_sig = None
+    if video:
+        video_sig = VideoFormat(video.get("codec_name"), video.get("profile"), _level(video), _codec_tag(video),
+                                video.get("extradata_hash"), video.get("width"), video.get("height"), video.get("pix_fmt"),
+                                video.get("r_frame_rate"), _normalize_sar(video.get("sample_aspect_ratio")))
+    audio_sig = None
+    if audio:
+        audio_sig = AudioFormat(audio.get("codec_name"), audio.get("profile"),
+                                audio.get("sample_rate"), audio.get("channels"))
+    return video_sig, audio_sig
+
+
+def _is_video_reproducible(video_sig):
+    """再エンコードで同じ形式（コーデック・プロファイル）を作れるか"""
+    return video_sig.codec in VIDEO_ENCODERS and video_sig.profile in VIDEO_PROFILES[video_sig.codec]
+
+
+def _is_audio_reproducible(audio_sig):
+    if audio_sig.codec not in AUDIO_ENCODERS:
+        return False
+    return audio_sig.codec not in AUDIO_PROFILES or audio_sig.profile in AUDIO_PROFILES[audio_sig.codec]
+
+
+def _is_copyable(signature):
+    video_sig, audio_sig = signature
+    return (video_sig is not None and _is_video_reproducible(video_sig)
+            and (audio_sig is None or _is_audio_reproducible(audio_sig)))
+
+
+def _choose_audio(clips):
+    """
+    音声付きのクリップがあれば結合後の音声形式を返す（コピー可能なもののうち合計時間が最長のもの）。
+    1本も無ければ None。
+    """
+    totals = {}
+    for _, info in clips:
+        audio_sig = clip_signature(info)[1]
+        if audio_sig:
+            totals[audio_sig] = totals.get(audio_sig, 0.0) + (probe.media_duration(info) or 0.0)
+    if not totals:
+        return None
+
+    copyable = [audio_sig for audio_sig in totals if _is_audio_reproducible(audio_sig)]
+    if copyable:
+        return max(copyable, key=lambda audio_sig: totals[audio_sig])
+    longest = max(totals, key=lambda audio_sig: totals[audio_sig])
+    return longest._replace(codec=FALLBACK_AUDIO_CODEC, profile=FALLBACK_AUDIO_PROFILE)
+
+
+def choose_target(clips):
+    """
+    結合後の形式を決める。コピー可能な形式のうち合計時間が最も長いものを選ぶ
+    （全クリップがこの形式と完全に一致していなければ、全クリップをこの形式で再エンコードする）。
+    音声の無い形式が選ばれても、音声付きのクリップが1本でもあれば音声ありにする（音声は削らない）。
+    """
+    totals = {}
+    for _, info in clips:
+        signature = clip_signature(info)
+        totals[signature] = totals.get(signature, 0.0) + (probe.media_duration(info) or 0.0)
+
+    copyable = [signature for signature in totals if _is_copyable(signature)]
+    if copyable:
+        video_sig, audio_sig = max(copyable, key=lambda signature: totals[signature])
+    else:
+        # どれもコピーできない場合は、最長の形式の解像度・フレームレートで h.264 に揃える
+        longest_video, _ = max(totals, key=lambda signature: totals[signature])
+        video_sig = longest_video._replace(codec=FALLBACK_VIDEO_CODEC, profile=FALLBACK_VIDEO_PROFILE, level=None,
+                                           tag=DEFAULT_CODEC_TAGS[FALLBACK_VIDEO_CODEC], extradata=None,
+                                           pix_fmt=FALLBACK_PIX_FMT)
+        audio_sig = None
+
+    if audio_sig is None:
+        audio_sig = _choose_audio(clips)
+    return video_sig, audio_sig
+
+
+def _channel_layout(channels):
+    return {1: "mono", 2: "stereo"}.get(channels, f"{channels}c")
+
+
+def _video_encode_args(video_sig, threads):
+    """
+    target と同じコーデック・プロファイル・レベルで映像をエンコードする引数。
+    エンコーダーが作るコーデック設定はクリップごとに異なりうるので、パラメータセットを
+    キーフレームごとにストリーム内にも書き、先頭クリップの設定しか残らない結合後でも正しく再生できるようにする。
+    """
+    args = ['-c:v', VIDEO_ENCODERS[video_sig.codec], '-threads', str(threads)]
+    profile = VIDEO_PROFILES[video_sig.codec].get(video_sig.profile)
+    if profile:
+        args.extend(['-profile:v', profile])
+    if video_sig.level and video_sig.codec == "h264":
+        # ffprobe は 4.1 を 41 と返す（1b だけは 9）
+        level = "1b" if video_sig.level == 9 else f"{video_sig.level // 10}.{video_sig.level % 10}"
+        args.extend(['-level:v', level])
+    elif video_sig.level and video_sig.codec == "hevc":
+        # HEVC は 4.1 が 123（レベル × 30）
+        args.extend(['-x265-params', f"level-idc={video_sig.level / 30:.1f}"])
+    args.extend(['-bsf:v', 'dump_extra=freq=keyframe', '-tag:v', INBAND_CODEC_TAGS[video_sig.codec]])
+    return args
+
+
+def _audio_encode_args(audio_sig):
+    """target と同じコーデック・プロファイル・サンプルレート・チャンネル数で音声をエンコードする引数"""
+    args = ['-c:a', AUDIO_ENCODERS[audio_sig.codec]]
+    profile = AUDIO_PROFILES.get(audio_sig.codec, {}).get(audio_sig.profile)
+    if profile:
+        args.extend(['-profile:a', profile])
+    args.extend(['-ar', str(audio_sig.sample_rate), '-ac', str(audio_sig.channels)])
+    return args
+
+
+def build_normalize_command(ffmpeg_path, clip, info, target, output_path, threads):
+    """
+    クリップを target の形式（コーデック・解像度・フレームレート・画素形式・音声）に揃える ffmpeg コマンド。
+    映像は常に再エンコードし（元のクリップとはコーデック設定が一致しないため）、音声は揃っていればコピーする。
+    """
+    video_sig, audio_sig = target
+    clip_audio = clip_signature(info)[1]
+    has_audio = clip_audio is not None
+
+    command = [str(ffmpeg_path), '-y', '-i', str(clip)]
+    if audio_sig and not has_audio:
+        # 音声の無いクリップには無音を足してストリーム構成を揃える
+        command.extend(['-f', 'lavfi', '-i',
+                        f"anullsrc=r={audio_sig.sample_rate}:cl={_channel_layout(audio_sig.channels)}"])
+
+    command.extend(['-map', '0:v:0'])
+    if audio_sig:
+        command.extend(['-map', '0:a:0' if has_audio else '1:a:0'])
+
+    width, height = video_sig.width, video_sig.height
+    video_filter = (
+        f"scale={width}:{height}:force_original_aspect_ratio=decrease:force_divisible_by=2,"
+        f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2,"
+        f"setsar={video_sig.sar.replace(':', '/')},fps={video_sig.frame_rate},format={video_sig.pix_fmt}"
+    )
+    command.extend(['-vf', video_filter])
+    command.extend(_video_encode_args(video_sig, threads))
+
+    if audio_sig is None:
+        # 音声付きのクリップが1本も無いときだけ（choose_target 参照）
+        command.append('-an')
+    elif clip_audio == audio_sig:
+        command.extend(['-c:a', 'copy'])
+    else:
+        command.extend(_audio_encode_args(audio_sig))
+        if not has_audio:
+            command.append('-shortest')
+
+    command.append(str(output_path))
+    return command
+
+
+def _concat_list_entry(path):
+    """concat デマクサ用のリスト行（シングルクォート内はエスケープが必要）"""
+    escaped = str(Path(path).resolve()).replace("'", "'\\''")
+    return f"file '{escaped}'\n"
+
+
+def join_clips(ffmpeg_path, ffprobe_path, clips, output_path, settings, gpu_available, on_progress=None):
+    """
+    クリップを順に結合して output_path に書き出し、(成功したか, 失敗理由, 除外したクリップ) を返す。
+    ffprobe で映像を読めないクリップは除外して残りを繋ぐ（除外したことは呼び出し側で報告する）。
+    全クリップの形式（コーデック設定まで）が揃っていれば -c copy でそのまま繋ぎ、
+    1本でも違えば全クリップを一時ファイルに再エンコードしてから繋ぐ（元のクリップと混ぜてコピーはしない）。
+    join_reencode が有効なら、結合結果に解像度・ビットレート設定を同じプロセス内で適用する。
+    """
+    probed = []
+    skipped = []
+    for clip in clips:
+        info = probe.probe_media(ffprobe_path, clip)
+        if info is None or "video" not in probe.main_streams(info):
+            print(f"Skipping {clip.name}: 映像ストリームを解析できません")
+            skipped.append(clip)
+            continue
+        probed.append((clip, info))
+    if not probed:
+        return False, "結合できるクリップがありません", skipped
+
+    target = choose_target(probed)
+    total_duration = sum(probe.media_duration(info) or 0.0 for _, info in probed)
+    expected = {"video": total_duration}
+    if target[1]:
+        expected["audio"] = total_duration
+
+    output_path.parent.mkdir(exist_ok=True)
+    threads = processor.get_thread_count(settings['thread_count'])
+    with tempfile.TemporaryDirectory(prefix=".join_", dir=output_path.parent) as tmp:
+        tmp_dir = Path(tmp)
+
+        # --- 形式が1本でも違えば、全クリップを揃える ---
+        if all(clip_signature(info) == target for _, info in probed):
+            parts = [clip for clip, _ in probed]
+        else:
+            parts = []
+            for index, (clip, info) in enumerate(probed):
+                normalized = tmp_dir / f"{index:05d}.mp4"
+                print(f"Normalizing {clip.name} for joining")
+                try:
+                    processor.run_ffmpeg(build_normalize_command(ffmpeg_path, clip, info, target, normalized, threads))
+                except subprocess.CalledProcessError as e:
+                    print(f"Failed to normalize {clip.name}. Error: {e.stderr.decode('utf-8', errors='ignore')}")
+                    return False, f"{clip.name} の形式を揃えられませんでした", skipped
+                parts.append(normalized)
+
+        list_file = tmp_dir / "concat.txt"
+        list_file.write_text("".join(_concat_list_entry(part) for part in parts), encoding='utf-8')
+
+        # --- concat デマクサで結合 ---
+        base = [str(ffmpeg_path), '-y', '-f', 'concat', '-safe', '0', '-i', str(list_file)]
+        reencode_command = base + processor.get_encode_args(settings, gpu_available)
+        if settings.get('join_reencode', 'off') == 'on':
+            video_filter = processor.build_video_filter(settings)
+            if video_filter:
+                reencode_command.extend(['-vf', video_filter])
+            attempts = [reencode_command]
+        else:
+            # -c copy は同じ入力なら同じ結果になるので、やり直すときは再エンコードに切り替える
+            attempts = [base + ['-c', 'copy'], reencode_command][:processor.MAX_RETRIES + 1]
+
+        reason = ""
+        for attempt, command in enumerate(attempts):
+            if attempt:
+                print(f"Retrying {output_path.name} with re-encoding")
+            output_path.unlink(missing_ok=True)
+            try:
+                processor.run_ffmpeg(command + [str(output_path)], total_duration, on_progress)
+            except subprocess.CalledProcessError as e:
+                print(f"Failed to join into {output_path.name}. Error: {e.stderr.decode('utf-8', errors='ignore')}")
+                return False, "結合に失敗しました", skipped
+            result, reason = verifier.verify_joined(ffprobe_path, expected, output_path)
+            if result != verifier.BROKEN:
+                return True, "", skipped
+            print(f"Verification failed for {output_path.name}: {reason}")
+        return False, reason, skipped
+
+
+def concat_videos(paths, settings, ffmpeg_path, progress_callback, file_callback, eta_callback, complete_callback):
+    """
+    ドロップされたフォルダ（またはファイル群）の動画を自然順に1本へ結合する。
+    進捗はコールバック関数を通じてGUIに通知される。
+    """
+    jobs = collect_jobs(paths)
+    if not jobs:
+        complete_callback("結合対象の動画ファイルが見つかりませんでした。")
+        return
+    # クリップの形式・長さを調べられないと結合も検証もできないので、最初に1回だけ確認する
+    ffprobe_path = probe.find_ffprobe(ffmpeg_path)
+    if ffprobe_path is None:
+        print("[ERROR] ffprobe が見つからないため、結合できません。")
+        complete_callback("ffprobe が見つかりません。結合モードには ffprobe.exe が必要です。")
+        return
+
+    total_jobs = len(jobs)
+    start_time = time.time()
+    reencode = settings.get('join_reencode', 'off') == 'on'
+    gpu_available = processor.is_gpu_available() if reencode else False
+    encoder = processor.get_codec_option(settings['codec'], gpu_available) if reencode else "copy"
+    failed_jobs = []
+    skipped_clips = []
+    status.BATCH.start("concat", total_jobs, encoder, (str(output_path) for output_path, _ in jobs))
+
+    for index, (output_path, clips) in enumerate(jobs):
+        # --- GUI更新 (ファイル名) ---
+        file_callback(f"{output_path.name}（{len(clips)}本を結合）")
+        status.BATCH.queue = tuple(str(path) for path, _ in jobs[index + 1:])
+        current = {"file": str(output_path), "clips": len(clips), "encoder": encoder,
+                   "progress": 0.0, "fps": None, "speed": None}
+        status.BATCH.current = current
+        status.BATCH.emit("file_started", file=str(output_path), clips=len(clips))
+
+        def on_progress(fraction, fps, speed):
+            status.BATCH.current = {**current, "progress": fraction, "fps": fps, "speed": speed}
+            if fraction is not None:
+                progress_callback((index + fraction) / total_jobs * 100)
+
+        joined, reason, skipped = join_clips(ffmpeg_path, ffprobe_path, clips, output_path, settings,
+                                             gpu_available, on_progress)
+        status.BATCH.current = None
+        if skipped:
+            # 黙って欠けたまま完了扱いにしないよう、除外したクリップは完了メッセージと状態サーバーに出す
+            skipped_clips.extend(skipped)
+            status.BATCH.emit("clips_skipped", file=str(output_path), clips=[str(clip) for clip in skipped])
+        if joined:
+            print(f"Successfully joined: {output_path.name}")
+            status.BATCH.emit("file_verified", file=str(output_path))
+        else:
+            print(f"Failed to join {output_path.name}: {reason}")
+            failed_jobs.append(output_path)
+            status.BATCH.fail(str(output_path), reason)
+
+        # --- GUI更新 (進捗・ETA) ---
+        processor.report_progress(index + 1, total_jobs, start_time, progress_callback, eta_callback)
+
+    # --- 結合完了処理 ---
+    winsound.Beep(1000, 500)
+    if failed_jobs:
+        message = f"結合が完了しました。（失敗: {len(failed_jobs)}件）"
+    elif skipped_clips:
+        message = "結合が完了しました。"
+    else:
+        message = "すべての動画の結合が完了しました！"
+    if skipped_clips:
+        names = "、".join(clip.name for clip in skipped_clips[:SKIPPED_NAMES_SHOWN])
+        if len(skipped_clips) > SKIPPED_NAMES_SHOWN:
+            names += f" ほか{len(skipped_clips) - SKIPPED_NAMES_SHOWN}本"
+        message += f"\n読み込めずに結合から除外したクリップ（{len(skipped_clips)}本）: {names}"
+    status.BATCH.finish(message)
+    complete_callback(message)
@@ -9,7 +9,12 @@ def load_settings(config_file):
             "width": "",
             "height": "",
             "split_seconds": "",
-            "thread_count": "MIDDLE"
+            "auto_crop": "off",
+            "thread_count": "MIDDLE",
+            "cache_size_gb": "10",
+            "status_port": "",
+            "join_mode": "off",
+            "join_reencode": "off"
         }
     try:
         with open(config_file, 'r', encoding='utf-8') as f:
@@ -21,7 +26,12 @@ def load_settings(config_file):
             "width": "",
             "height": "",
             "split_seconds": "",
-            "thread_count": "MIDDLE"
+            "auto_crop": "off",
+            "thread_count": "MIDDLE",
+            "cache_size_gb": "10",
+            "status_port": "",
+            "join_mode": "off",
+            "join_reencode": "off"
         }
     
     
@@ -3,7 +3,9 @@ from tkinterdnd2 import DND_FILES, TkinterDnD
 from tkinter import filedialog, messagebox, Toplevel, Listbox
 import tkinter as tk  # iconphoto用
 import processor
+import concat
 import config
+import status
 import threading
 
 # ===== ウィンドウアイコン（Base64埋め込みPNG）=====
@@ -13,7 +15,7 @@ ICON_PNG_BASE64 = (
 )
 
 class App(ctk.CTk, TkinterDnD.Tk):
-    def __init__(self, ffmpeg_path, icon_path, config_file, presets_file):
+    def __init__(self, ffmpeg_path, icon_path, config_file, presets_file, cache_dir=None):
 
         ctk.CTk.__init__(self)
         TkinterDnD.Tk.__init__(self)
@@ -37,6 +39,7 @@ class App(ctk.CTk, TkinterDnD.Tk):
         self.ffmpeg_path = ffmpeg_path
         self.config_file = config_file
         self.presets_file = presets_file
+        self.cache_dir = cache_dir
 
         # --- GUIコンポーネントの初期化 ---
         self._create_widgets()
@@ -125,9 +128,19 @@ class App(ctk.CTk, TkinterDnD.Tk):
                                         values=["MAX", "MIDDLE", "LOW"], font=self.font)
         thread_menu.pack(side="left", padx=5, fill="x", expand=True)
 
+        # --- 結合モード ---
+        join_frame = ctk.CTkFrame(tab)
+        join_frame.grid(row=1, column=0, padx=10, pady=10, sticky="ew")
+        self.join_mode_var = ctk.StringVar(value="off")
+        ctk.CTkCheckBox(join_frame, text="結合モード（フォルダ内の動画を1本に結合）", variable=self.join_mode_var,
+                        onvalue="on", offvalue="off", font=self.font).pack(side="left", padx=5, pady=5)
+        self.join_reencode_var = ctk.StringVar(value="off")
+        ctk.CTkCheckBox(join_frame, text="結合後に解像度・ビットレートを適用", variable=self.join_reencode_var,
+                        onvalue="on", offvalue="off", font=self.font).pack(side="left", padx=5, pady=5)
+
         # --- プリセット管理 ---
         preset_frame = ctk.CTkFrame(tab)
-        preset_frame.grid(row=1, column=0, padx=10, pady=10, sticky="nsew")
+        preset_frame.grid(row=2, column=0, padx=10, pady=10, sticky="nsew")
         preset_frame.grid_columnconfigure(0, weight=1)
 
         ctk.CTkLabel(preset_frame, text="プリセット管理", font=(self.font[0], 14, "bold")).grid(
@@ -179,15 +192,33 @@ class App(ctk.CTk, TkinterDnD.Tk):
         height_entry = ctk.CTkEntry(size_frame, textvariable=self.height_var, font=self.font, width=80)
         height_entry.pack(side="left", fill="x", expand=True)
 
+        # --- 黒帯の自動切り抜き ---
+        self.auto_crop_var = ctk.StringVar(value="off")
+        auto_crop_check = ctk.CTkCheckBox(tab, text="黒帯を自動で切り抜く（解像度指定時は縦横比を保って収める）",
+                                          variable=self.auto_crop_var, onvalue="on", offvalue="off", font=self.font)
+        auto_crop_check.grid(row=3, column=1, padx=10, pady=10, sticky="w")
+
         # --- 分割設定 ---
-        ctk.CTkLabel(tab, text="分割秒数 (任意):", font=self.font).grid(row=3, column=0, padx=10, pady=10, sticky="e")
+        ctk.CTkLabel(tab, text="分割秒数 (任意):", font=self.font).grid(row=4, column=0, padx=10, pady=10, sticky="e")
         self.split_seconds_var = ctk.StringVar()
         split_entry = ctk.CTkEntry(tab, textvariable=self.split_seconds_var, font=self.font)
-        split_entry.grid(row=3, column=1, padx=10, pady=10, sticky="ew")
+        split_entry.grid(row=4, column=1, padx=10, pady=10, sticky="ew")
+
+        # --- 出力キャッシュ ---
+        ctk.CTkLabel(tab, text="キャッシュ上限 (GB, 0で無効):", font=self.font).grid(row=5, column=0, padx=10, pady=10, sticky="e")
+        self.cache_size_var = ctk.StringVar(value="10")
+        cache_entry = ctk.CTkEntry(tab, textvariable=self.cache_size_var, font=self.font)
+        cache_entry.grid(row=5, column=1, padx=10, pady=10, sticky="ew")
+
+        # --- 状態サーバー ---
+        ctk.CTkLabel(tab, text="状態サーバーのポート (任意):", font=self.font).grid(row=6, column=0, padx=10, pady=10, sticky="e")
+        self.status_port_var = ctk.StringVar()
+        status_port_entry = ctk.CTkEntry(tab, textvariable=self.status_port_var, font=self.font)
+        status_port_entry.grid(row=6, column=1, padx=10, pady=10, sticky="ew")
 
         # --- プリセット保存 ---
         save_preset_frame = ctk.CTkFrame(tab)
-        save_preset_frame.grid(row=4, column=0, columnspan=2, padx=10, pady=20, sticky="ew")
+        save_preset_frame.grid(row=7, column=0, columnspan=2, padx=10, pady=20, sticky="ew")
         save_preset_frame.grid_columnconfigure(0, weight=1)
 
         self.preset_name_entry = ctk.CTkEntry(save_preset_frame, placeholder_text="プリセット名を入力", font=self.font)
@@ -205,7 +236,12 @@ class App(ctk.CTk, TkinterDnD.Tk):
             "width": self.width_var.get(),
             "height": self.height_var.get(),
             "split_seconds": self.split_seconds_var.get(),
-            "thread_count": self.thread_count_var.get()
+            "auto_crop": self.auto_crop_var.get(),
+            "thread_count": self.thread_count_var.get(),
+            "cache_size_gb": self.cache_size_var.get(),
+            "status_port": self.status_port_var.get(),
+            "join_mode": self.join_mode_var.get(),
+            "join_reencode": self.join_reencode_var.get()
         }
 
     def apply_settings(self, settings):
@@ -215,7 +251,12 @@ class App(ctk.CTk, TkinterDnD.Tk):
         self.width_var.set(settings.get("width", ""))
         self.height_var.set(settings.get("height", ""))
         self.split_seconds_var.set(settings.get("split_seconds", ""))
+        self.auto_crop_var.set(settings.get("auto_crop", "off"))
         self.thread_count_var.set(settings.get("thread_count", "MIDDLE"))
+        self.cache_size_var.set(settings.get("cache_size_gb", "10"))
+        self.status_port_var.set(settings.get("status_port", ""))
+        self.join_mode_var.set(settings.get("join_mode", "off"))
+        self.join_reencode_var.set(settings.get("join_reencode", "off"))
 
     def select_files(self):
         files = filedialog.askopenfilenames(
@@ -235,24 +276,35 @@ class App(ctk.CTk, TkinterDnD.Tk):
         if paths:
             self.start_conversion(paths)
 
+    def sync_status_server(self):
+        """ポート設定に合わせて状態サーバーを起動・停止する（空欄なら停止）"""
+        port = self.status_port_var.get().strip()
+        if port.isdigit() and 0 < int(port) < 65536:
+            status.start_server(int(port))
+        else:
+            status.stop_server()
+
     def start_conversion(self, paths):
         # 現在の設定を保存
         config.save_settings(self.config_file, self.get_current_settings())
+        self.sync_status_server()
 
-        # 変換処理を別スレッドで実行
-        conv_thread = threading.Thread(
-            target=processor.process_videos,
-            args=(
-                paths,
-                self.get_current_settings(),
-                self.ffmpeg_path,
-                self.update_progress,
-                self.update_current_file,
-                self.update_eta,
-                self.on_conversion_complete
-            ),
-            daemon=True
-        )
+        settings = self.get_current_settings()
+        callbacks = (self.update_progress, self.update_current_file, self.update_eta, self.on_conversion_complete)
+
+        # 変換（または結合）処理を別スレッドで実行
+        if concat.is_join_mode(settings):
+            conv_thread = threading.Thread(
+                target=concat.concat_videos,
+                args=(paths, settings, self.ffmpeg_path, *callbacks),
+                daemon=True
+            )
+        else:
+            conv_thread = threading.Thread(
+                target=processor.process_videos,
+                args=(paths, settings, self.ffmpeg_path, *callbacks, self.cache_dir),
+                daemon=True
+            )
         conv_thread.start()
 
     # --- 別スレッドからのGUI更新用コールバック ---
@@ -317,6 +369,7 @@ class App(ctk.CTk, TkinterDnD.Tk):
         settings = config.load_settings(self.config_file)
         self.apply_settings(settings)
         self.refresh_preset_list()
+        self.sync_status_server()
 
     def show_readme(self):
         readme_window = Toplevel(self)
@@ -342,8 +395,11 @@ class App(ctk.CTk, TkinterDnD.Tk):
             "- ビットレート（kbps）指定・自動（auto）\n"
             "- 解像度指定（幅×高さ）／未指定なら元解像度のまま\n"
             "- 秒数での自動分割（任意）\n"
+            "- 黒帯（レターボックス）の自動検出・切り抜き（任意）\n"
+            "- 結合モード：フォルダ内の動画を名前順に1本へ結合（全クリップの形式が同じなら再エンコードなし）\n"
             "- スレッド数の目安（MAX / MIDDLE / LOW）\n"
-            "- プリセットの保存／適用／削除\n\n"
+            "- プリセットの保存／適用／削除\n"
+            "- 同じ内容の動画は変換結果をキャッシュから再利用（上限GBを超えると古いものから削除）\n\n"
             "【基本の使い方（超かんたん）】\n"
             "1) 変換したい動画ファイルを、このウィンドウへドラッグ＆ドロップします。\n"
             "   もしくは「動画ファイルを選択」または「フォルダを選択」から指定します。\n"
@@ -362,7 +418,10 @@ class App(ctk.CTk, TkinterDnD.Tk):
             "- 不要になったら［プリセットを削除］\n\n"
             "【ログ／設定ファイル】\n"
             "- 設定・プリセットは exe と同じ場所に保存されます。\n"
-            "- 変換の進行やエラーはポップアップ・表示欄で確認できます。\n\n"
+            "- 変換の進行やエラーはポップアップ・表示欄で確認できます。\n"
+            "- 詳細設定で状態サーバーのポートを指定すると、http://127.0.0.1:ポート/status で\n"
+            "  キュー・進捗・fps・速度・エンコーダー・直近の失敗・予想残り時間を JSON で取得できます。\n"
+            "  /events ではイベントを逐次受け取れます（Server-Sent Events）。\n\n"
             "©️2025 KisaragiIchigo\n"
         )
 
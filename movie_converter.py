@@ -73,14 +73,17 @@ def setup_library_modules(base_path: Path) -> None:
 
 
 # ====== 外部リソースの解決＆用意 ======
-def resource_extraction(base_path: Path) -> tuple[Path | None, Path, Path]:
+def resource_extraction(base_path: Path) -> tuple[Path | None, Path, Path, Path]:
     """
-    - ffmpeg.exe を展開許可リストに従ってコピー（utils.get_resource_path）
+    - ffmpeg.exe / ffprobe.exe を展開許可リストに従ってコピー（utils.get_resource_path）
     - config ディレクトリを作成
+    - 出力キャッシュ用の cache ディレクトリを決める（作成は使用時）
     - 設定JSON/プリセットJSONを未存在なら "{}" で作成
     """
     # ▼ ffmpeg はホワイトリストでコピー対象
     ffmpeg_path = utils.get_resource_path("ffmpeg.exe", base_path)
+    # ▼ ffprobe も同梱されていれば ffmpeg の隣に展開（出力検証で使用）
+    utils.get_resource_path("ffprobe.exe", base_path)
 
     # 設定フォルダ
     config_dir = base_path / "config"
@@ -97,7 +100,9 @@ def resource_extraction(base_path: Path) -> tuple[Path | None, Path, Path]:
             except Exception as e:
                 print(f"Failed to initialize config file '{p.name}': {e}")
 
-    return ffmpeg_path, config_file, presets_file
+    cache_dir = base_path / "cache"
+
+    return ffmpeg_path, config_file, presets_file, cache_dir
 
 
 # ====== ffmpeg 実体の最終決定 ======
@@ -123,7 +128,7 @@ if __name__ == "__main__":
     setup_library_modules(base_path)
 
     # 2) 外部ファイル（ffmpeg / config系）の用意
-    _ffmpeg_path, CONFIG_FILE, PRESETS_FILE = resource_extraction(base_path)
+    _ffmpeg_path, CONFIG_FILE, PRESETS_FILE, CACHE_DIR = resource_extraction(base_path)
     FFMPEG_PATH_STR = _resolve_ffmpeg(_ffmpeg_path)
 
     # 3) customtkinter のテーマ設定
@@ -135,6 +140,7 @@ if __name__ == "__main__":
         ffmpeg_path=FFMPEG_PATH_STR,
         icon_path=None,              # いまはBase64アイコンをgui.py側で使ってる
         config_file=CONFIG_FILE,
-        presets_file=PRESETS_FILE
+        presets_file=PRESETS_FILE,
+        cache_dir=CACHE_DIR
     )
     app.mainloop()
\ No newline at end of file
@@ -0,0 +1,221 @@
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+CACHE_VERSION = 1          # 出力形式を変えたら上げる（古いキャッシュを無効化）
+SAMPLE_COUNT = 16          # 指紋に使うサンプルブロック数
+SAMPLE_SIZE = 64 * 1024    # サンプル1個あたりのバイト数
+INDEX_NAME = "index.json"
+STAGING_SUFFIX = ".staging"  # 登録中のエントリを用意する一時フォルダの接尾辞
+FICLONE = 0x40049409       # Linux の reflink ioctl
+
+
+def fingerprint(path):
+    """
+    ファイル内容の簡易指紋。サイズ＋等間隔に取ったブロックのハッシュで、全体は読まない。
+    同じ動画を別フォルダにコピーしたものは同じ指紋になる。
+    """
+    size = Path(path).stat().st_size
+    digest = hashlib.blake2b(str(size).encode(), digest_size=16)
+    if size == 0:
+        return digest.hexdigest()
+
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if size <= SAMPLE_COUNT * SAMPLE_SIZE:
+            digest.update(mm[:])
+        else:
+            # 先頭と末尾を必ず含むように均等配置
+            step = (size - SAMPLE_SIZE) // (SAMPLE_COUNT - 1)
+            for i in range(SAMPLE_COUNT):
+                offset = i * step
+                digest.update(mm[offset:offset + SAMPLE_SIZE])
+    return digest.hexdigest()
+
+
+def settings_hash(options):
+    """出力に影響する設定だけを並び順に依存しない形でハッシュ化する"""
+    payload = json.dumps({"version": CACHE_VERSION, **options}, sort_keys=True, ensure_ascii=False)
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def _reflink(src, dst):
+    """対応ファイルシステム（btrfs/XFS 等）で reflink する。非対応なら OSError"""
+    try:
+        import fcntl
+    except ImportError as e:  # Windows
+        raise OSError("reflink is not supported") from e
+    with open(src, 'rb') as s, open(dst, 'wb') as d:
+        try:
+            fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+        except OSError:
+            d.close()
+            os.remove(dst)
+            raise
+
+
+def reflink_or_copy(src, dst):
+    """reflink → 通常コピーの順に試して dst を作る（src とは別の実体になる）"""
+    dst = Path(dst)
+    dst.unlink(missing_ok=True)
+    try:
+        _reflink(src, dst)
+        return
+    except OSError:
+        pass
+    shutil.copy2(src, dst)
+
+
+def link_or_copy(src, dst):
+    """ハードリンク → reflink → 通常コピーの順に試して dst を作る"""
+    dst = Path(dst)
+    dst.unlink(missing_ok=True)
+    try:
+        os.link(src, dst)
+        return
+    except OSError:
+        pass
+    reflink_or_copy(src, dst)
+
+
+def _file_state(path):
+    """改変検知用のサイズと更新時刻"""
+    st = Path(path).stat()
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+class OutputCache:
+    """
+    変換結果のグローバルキャッシュ。
+    キーは（入力の指紋 × 正規化した設定のハッシュ）で、容量上限を超えたら最終利用の古い順に削除する。
+    """
+
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.index_file = self.cache_dir / INDEX_NAME
+        self._lock = threading.Lock()
+        # key -> {"files": {接尾辞: {"size": サイズ, "mtime_ns": 更新時刻}}, "last_used": 時刻}
+        self._index = self._load_index()
+        # 登録の途中で終了したときの残骸を片付ける
+        for staging_dir in self.cache_dir.glob(f"*{STAGING_SUFFIX}"):
+            shutil.rmtree(staging_dir, ignore_errors=True)
+
+    def _load_index(self):
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save_index(self):
+        tmp_file = self.index_file.with_suffix(".tmp")
+        try:
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(self._index, f, ensure_ascii=False, indent=4)
+            os.replace(tmp_file, self.index_file)
+        except Exception as e:
+            print(f"キャッシュ索引の保存に失敗しました: {e}")
+
+    def make_key(self, source_path, options):
+        """キャッシュキーを返す。入力が読めなければ None"""
+        try:
+            return f"{fingerprint(source_path)}-{settings_hash(options)}"
+        except (OSError, ValueError) as e:
+            print(f"Failed to fingerprint {Path(source_path).name}: {e}")
+            return None
+
+    def _entry_is_intact(self, key, entry):
+        """
+        キャッシュ内のファイルが揃っていて、サイズ・更新時刻が登録時のままか。
+        登録元・復元先とはハードリンクで実体を共有するので、それらをその場で編集されるとここで検知して捨てる。
+        """
+        for suffix, state in entry["files"].items():
+            cached = self.cache_dir / key / suffix
+            if not isinstance(state, dict) or not cached.exists() or _file_state(cached) != state:
+                return False
+        return bool(entry["files"])
+
+    @staticmethod
+    def _entry_size(entry):
+        return sum(state["size"] for state in entry["files"].values() if isinstance(state, dict))
+
+    def _remove_entry(self, key):
+        shutil.rmtree(self.cache_dir / key, ignore_errors=True)
+        self._index.pop(key, None)
+
+    def restore(self, key, output_dir, stem):
+        """
+        キャッシュにあれば output_dir に stem 名で出力ファイルを作って一覧を返す。
+        無ければ（または壊れていれば）None。
+        """
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None:
+                return None
+            if not self._entry_is_intact(key, entry):
+                self._remove_entry(key)
+                self._save_index()
+                return None
+
+            restored = []
+            for suffix in entry["files"]:
+                target = Path(output_dir) / f"{stem}{suffix}"
+                link_or_copy(self.cache_dir / key / suffix, target)
+                restored.append(target)
+            entry["last_used"] = time.time()
+            self._save_index()
+            return restored
+
+    def store(self, key, output_files, stem):
+        """
+        検証済みの出力ファイルをキャッシュに登録し、上限を超えた分を追い出す。
+        ファイルの用意（別ドライブならコピー）はロックの外で行い、変換側の restore を待たせない。
+        """
+        files = {}
+        try:
+            staging_dir = Path(tempfile.mkdtemp(prefix=f"{key}.", suffix=STAGING_SUFFIX, dir=self.cache_dir))
+        except OSError as e:
+            print(f"キャッシュへの登録に失敗しました: {e}")
+            return
+        try:
+            for output_file in output_files:
+                # stem 以降（".mp4" や "_000.mp4"）だけを保存名にして、別名の入力にも使えるようにする
+                suffix = Path(output_file).name[len(stem):]
+                # 同じドライブならハードリンクで、容量も書き込みも増やさない
+                link_or_copy(output_file, staging_dir / suffix)
+                files[suffix] = _file_state(staging_dir / suffix)
+        except OSError as e:
+            print(f"キャッシュへの登録に失敗しました: {e}")
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            return
+
+        with self._lock:
+            entry_dir = self.cache_dir / key
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            try:
+                os.replace(staging_dir, entry_dir)
+            except OSError as e:
+                print(f"キャッシュへの登録に失敗しました: {e}")
+                shutil.rmtree(staging_dir, ignore_errors=True)
+                self._index.pop(key, None)
+                self._save_index()
+                return
+            self._index[key] = {"files": files, "last_used": time.time()}
+            self._evict()
+            self._save_index()
+
+    def _evict(self):
+        """合計サイズが上限以下になるまで最終利用の古いものから削除する（LRU）"""
+        total = sum(self._entry_size(entry) for entry in self._index.values())
+        for key in sorted(self._index, key=lambda k: self._index[k]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            total -= self._entry_size(self._index[key])
+            self._remove_entry(key)
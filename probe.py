@@ -0,0 +1,195 @@
+import json
+import os
+import re
+import shutil
+import subprocess
+import threading
+from pathlib import Path
+
+import utils
+
+# 解析結果キャッシュ: (絶対パス, サイズ, 更新時刻) -> {"probe": ffprobe結果, "crop": 黒帯検出結果}
+_probe_cache = {}
+_probe_cache_lock = threading.Lock()
+
+CROP_SAMPLE_POINTS = (0.2, 0.5, 0.8)  # 黒帯検出で見る位置（全体の長さに対する割合）
+CROP_SAMPLE_SECONDS = 2               # 1か所あたりに解析する秒数
+CROP_MIN_PIXELS = 8                   # これ未満しか削れないなら切り抜かない
+# 黒とみなす明るさの上限。0〜1 の比率で指定すると ffmpeg が画素のビット深度に合わせて換算する
+# （8bit の 24 相当。絶対値だと 10bit の HDR 素材では暗すぎてほとんど切り抜けない）
+CROP_BLACK_LIMIT = 0.094
+
+
+def get_ffprobe_path(ffmpeg_path):
+    """ffmpeg のパスから ffprobe のパスを決める（同じフォルダ優先、無ければ PATH）"""
+    candidate = "ffprobe.exe" if os.name == "nt" else "ffprobe"
+    ffmpeg = Path(ffmpeg_path)
+    sibling = ffmpeg.with_name(candidate)
+    if ffmpeg.parent != Path(".") and sibling.exists():
+        return str(sibling)
+    return candidate
+
+
+def find_ffprobe(ffmpeg_path):
+    """ffprobe を探して実行できるパスを返す。見つからなければ None"""
+    candidate = get_ffprobe_path(ffmpeg_path)
+    if Path(candidate).is_file() or shutil.which(candidate):
+        return candidate
+    return None
+
+
+def _file_signature(path):
+    """キャッシュキー。ファイルが差し替えられたら別キーになるようサイズと更新時刻を含める"""
+    st = path.stat()
+    return (str(path.resolve()), st.st_size, st.st_mtime_ns)
+
+
+def probe_media(ffprobe_path, path, use_cache=True):
+    """
+    ffprobe でコンテナとストリームの情報を取得して dict で返す。失敗時（ffprobe_path が None を含む）は None。
+    ヘッダ・インデックスを読むだけでデコードはしないので、長尺の動画でもすぐ終わる。
+    """
+    if not ffprobe_path:
+        return None
+    path = Path(path)
+    try:
+        key = _file_signature(path)
+    except OSError:
+        return None
+
+    if use_cache:
+        with _probe_cache_lock:
+            if "probe" in _probe_cache.get(key, {}):
+                return _probe_cache[key]["probe"]
+
+    command = [
+        str(ffprobe_path), '-v', 'error',
+        '-print_format', 'json',
+        '-show_format', '-show_streams',
+        '-show_data_hash', 'MD5',  # extradata_hash（コーデック設定が同じかの比較用）
+        str(path)
+    ]
+    try:
+        result = subprocess.run(command, check=True, startupinfo=utils.hidden_startupinfo(),
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        info = json.loads(result.stdout.decode('utf-8', errors='ignore'))
+    except (FileNotFoundError, subprocess.CalledProcessError, json.JSONDecodeError) as e:
+        print(f"Failed to probe {path.name}: {e}")
+        return None
+
+    if use_cache:
+        with _probe_cache_lock:
+            _probe_cache.setdefault(key, {})["probe"] = info
+    return info
+
+
+def _parse_seconds(value):
+    """'12.345' または mkv タグ形式 '00:00:12.345000000' を秒に変換する"""
+    if value in (None, "", "N/A"):
+        return None
+    try:
+        if ":" in str(value):
+            h, m, s = str(value).split(":")
+            return int(h) * 3600 + int(m) * 60 + float(s)
+        return float(value)
+    except ValueError:
+        return None
+
+
+def media_duration(info):
+    """コンテナ全体の長さ（秒）。不明なら None"""
+    return _parse_seconds(info.get("format", {}).get("duration"))
+
+
+def main_streams(info):
+    """映像・音声ストリームを種類ごとに先頭1本ずつ返す（カバー画像は除外）"""
+    streams = {}
+    for stream in info.get("streams", []):
+        codec_type = stream.get("codec_type")
+        if codec_type not in ("video", "audio") or codec_type in streams:
+            continue
+        if stream.get("disposition", {}).get("attached_pic"):
+            continue
+        streams[codec_type] = stream
+    return streams
+
+
+def stream_duration(stream, info):
+    """ストリームの長さ（秒）。ストリームに無ければタグ、最後はコンテナの長さで代用"""
+    duration = _parse_seconds(stream.get("duration"))
+    if duration is None:
+        tags = stream.get("tags", {})
+        duration = _parse_seconds(tags.get("DURATION") or tags.get("duration"))
+    if duration is None:
+        duration = media_duration(info)
+    return duration
+
+
+def _display_size(stream):
+    """回転メタデータ（縦動画など）を考慮した表示上の幅・高さ"""
+    width, height = stream.get("width"), stream.get("height")
+    rotation = stream.get("tags", {}).get("rotate")
+    for side_data in stream.get("side_data_list", []):
+        rotation = side_data.get("rotation", rotation)
+    try:
+        if abs(int(float(rotation or 0))) % 180 == 90:
+            return height, width
+    except ValueError:
+        pass
+    return width, height
+
+
+def _sample_crop(ffmpeg_path, path, start):
+    """start 秒から数秒だけデコードして cropdetect の結果 (w, h, x, y) を返す"""
+    command = [
+        str(ffmpeg_path), '-hide_banner', '-nostats',
+        '-ss', f"{start:.2f}", '-i', str(path),
+        '-t', str(CROP_SAMPLE_SECONDS), '-an', '-sn',
+        # reset=0 なので最後の出力がこの区間全体を包む範囲になる
+        '-vf', f"cropdetect=limit={CROP_BLACK_LIMIT}:round=2:reset=0",
+        '-f', 'null', '-'
+    ]
+    try:
+        result = subprocess.run(command, startupinfo=utils.hidden_startupinfo(),
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except FileNotFoundError:
+        return None
+    matches = re.findall(r"crop=(\d+):(\d+):(\d+):(\d+)", result.stderr.decode('utf-8', errors='ignore'))
+    return tuple(int(v) for v in matches[-1]) if matches else None
+
+
+def detect_crop(ffmpeg_path, ffprobe_path, path):
+    """
+    動画の黒帯（レターボックス／ピラーボックス）を検出し、残す範囲 (w, h, x, y) を返す。
+    黒帯が無い・判定できない場合は None。結果は ffprobe の結果と一緒にキャッシュする。
+    """
+    path = Path(path)
+    info = probe_media(ffprobe_path, path)
+    if info is None:
+        return None
+    key = _file_signature(path)
+    with _probe_cache_lock:
+        if "crop" in _probe_cache.get(key, {}):
+            return _probe_cache[key]["crop"]
+
+    video = main_streams(info).get("video")
+    width, height = _display_size(video) if video else (None, None)
+    crop = None
+    if width and height:
+        # 数か所の結果をすべて包む範囲にする（暗いシーンで絵を削りすぎないように）
+        duration = media_duration(info) or 0
+        boxes = [box for box in (_sample_crop(ffmpeg_path, path, duration * point)
+                                 for point in CROP_SAMPLE_POINTS) if box]
+        if boxes:
+            left = min(x for _, _, x, _ in boxes)
+            top = min(y for _, _, _, y in boxes)
+            right = min(width, max(x + w for w, _, x, _ in boxes))
+            bottom = min(height, max(y + h for _, h, _, y in boxes))
+            crop_w = (right - left) // 2 * 2
+            crop_h = (bottom - top) // 2 * 2
+            if crop_w > 0 and crop_h > 0 and (width - crop_w >= CROP_MIN_PIXELS or height - crop_h >= CROP_MIN_PIXELS):
+                crop = (crop_w, crop_h, left, top)
+
+    with _probe_cache_lock:
+        _probe_cache.setdefault(key, {})["crop"] = crop
+    return crop
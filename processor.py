@@ -1,11 +1,25 @@
 import os
 import subprocess
+import threading
 import time
+import uuid
 import multiprocessing
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from pathlib import Path
 from natsort import natsorted
 import winsound
 
+import output_cache
+import probe
+import status
+import utils
+import verifier
+
+OUTPUT_DIR_NAME = "[MovieConverter]ResizedMovie"
+VERIFY_WORKERS = 2  # 出力検証を行うバックグラウンドスレッド数
+MAX_RETRIES = 1     # 検証に失敗したファイルを再変換する回数
+
 def get_valid_files(paths):
     """
     入力されたパスリストから、有効な動画ファイル（またはフォルダ内の動画ファイル）のリストを返す。
@@ -29,11 +43,8 @@ def is_gpu_available():
     """NVIDIA GPU (nvidia-smi) が利用可能かチェックする"""
     try:
         # startupinfoを使ってコンソールウィンドウを非表示にする
-        si = subprocess.STARTUPINFO()
-        si.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-        si.wShowWindow = subprocess.SW_HIDE
-        
-        subprocess.run(['nvidia-smi'], stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True, startupinfo=si)
+        subprocess.run(['nvidia-smi'], stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True,
+                       startupinfo=utils.hidden_startupinfo())
         print("NVIDIA GPU is available.")
         return True
     except (FileNotFoundError, subprocess.CalledProcessError):
@@ -64,9 +75,240 @@ def format_time(seconds):
     m, s = divmod(rem, 60)
     return f"{int(h):02}:{int(m):02}:{int(s):02}"
 
-def process_videos(paths, settings, ffmpeg_path, progress_callback, file_callback, eta_callback, complete_callback):
+def get_split_seconds(settings):
+    """分割秒数の設定を int で返す。未指定・不正な値なら None"""
+    split_seconds = settings.get('split_seconds', '')
+    if split_seconds.isdigit() and int(split_seconds) > 0:
+        return int(split_seconds)
+    return None
+
+def is_auto_crop(settings):
+    """黒帯の自動切り抜きが有効か"""
+    return settings.get('auto_crop', 'off') == 'on'
+
+def get_output_options(settings, gpu_available):
+    """出力内容に影響する設定を正規化して返す（出力キャッシュのキーに使う）"""
+    has_size = settings['width'].isdigit() and settings['height'].isdigit()
+    options = {
+        "codec": get_codec_option(settings['codec'], gpu_available),
+        "bitrate": settings['bitrate'] if settings['bitrate'].isdigit() else "auto",
+        "scale": f"{settings['width']}:{settings['height']}" if has_size else "",
+        "split_seconds": get_split_seconds(settings) or 0,
+        "auto_crop": is_auto_crop(settings),
+    }
+    if is_auto_crop(settings):
+        # 黒帯検出の基準を変えると切り抜き範囲も変わるので、古い基準の出力はキャッシュから使わない
+        options["crop_detect"] = {
+            "limit": probe.CROP_BLACK_LIMIT,
+            "points": list(probe.CROP_SAMPLE_POINTS),
+            "seconds": probe.CROP_SAMPLE_SECONDS,
+            "min_pixels": probe.CROP_MIN_PIXELS,
+        }
+    return options
+
+def open_output_cache(cache_dir, settings):
+    """設定の容量上限（GB）で出力キャッシュを開く。無効（0/未指定）なら None"""
+    size_gb = settings.get('cache_size_gb', '')
+    if not cache_dir or not size_gb.replace('.', '', 1).isdigit() or float(size_gb) <= 0:
+        return None
+    try:
+        return output_cache.OutputCache(cache_dir, int(float(size_gb) * 1024 ** 3))
+    except OSError as e:
+        print(f"出力キャッシュを開けませんでした: {e}")
+        return None
+
+def _output_stem(output_path, split_seconds):
+    """出力先パス（分割時は連番パターン）から連番を除いたファイル名部分"""
+    return output_path.stem[:-len("_%03d")] if split_seconds else output_path.stem
+
+def list_outputs(output_path, split_seconds):
+    """変換で作られた出力ファイルの一覧"""
+    if split_seconds:
+        return verifier.segment_paths(output_path.parent, _output_stem(output_path, split_seconds))
+    return [output_path]
+
+def publish_outputs(work_path, output_path, split_seconds):
+    """
+    一時的な名前で書き出した出力を本来の名前に移す。
+    前回の出力は上書きせず先に消す（キャッシュとハードリンクされている場合があるため。
+    分割時は古い連番が残っていると本数が合わなくなる）。
+    """
+    for stale in list_outputs(output_path, split_seconds):
+        stale.unlink(missing_ok=True)
+    work_stem = _output_stem(work_path, split_seconds)
+    stem = _output_stem(output_path, split_seconds)
+    for work_file in list_outputs(work_path, split_seconds):
+        os.replace(work_file, output_path.parent / f"{stem}{work_file.name[len(work_stem):]}")
+
+def discard_outputs(output_path, split_seconds):
+    """失敗した変換の出力を消す（壊れた出力が正常な出力と同じ名前で残らないように）"""
+    for output_file in list_outputs(output_path, split_seconds):
+        try:
+            output_file.unlink(missing_ok=True)
+        except OSError as e:
+            print(f"Failed to remove {output_file.name}: {e}")
+
+def _verify_and_cache(cache, cache_key, ffprobe_path, file_path, work_path, split_seconds):
+    """一時的な名前の出力を検証し、検証に通ったものだけキャッシュに登録する（検証スレッドで実行）"""
+    result, reason = verifier.verify_output(ffprobe_path, file_path, work_path, split_seconds)
+    if result == verifier.VERIFIED and cache and cache_key:
+        cache.store(cache_key, list_outputs(work_path, split_seconds), _output_stem(work_path, split_seconds))
+    return result, reason
+
+def get_output_path(file_path, split_seconds, stem=None):
+    """出力先パス（分割時は連番パターン）を返す。stem を渡すとファイル名部分をそれにする"""
+    stem = stem or file_path.stem
+    output_filename = stem + ".mp4"
+    if split_seconds:
+        # 分割する場合は連番をつける
+        output_filename = stem + "_%03d.mp4"
+    return file_path.parent / OUTPUT_DIR_NAME / output_filename
+
+def get_work_stem(file_path):
+    """
+    変換中の一時的なファイル名部分。検証が終わるまで本来の名前は使わない
+    （clip.mov と clip.mp4 のように出力名が同じ入力が、検証中の出力を上書きし合わないように）
+    """
+    return f"{file_path.stem}.converting-{uuid.uuid4().hex[:8]}"
+
+def restore_outputs(cache, cache_key, file_path, split_seconds):
+    """
+    キャッシュにあれば一時的な名前に復元してから本来の名前に移し、True を返す。
+    書き込めなかった場合（古い出力が開かれている・空き容量不足など）は途中のファイルを消して OSError を送出する。
+    """
+    work_stem = get_work_stem(file_path)
+    work_path = get_output_path(file_path, split_seconds, work_stem)
+    try:
+        if not cache.restore(cache_key, file_path.parent / OUTPUT_DIR_NAME, work_stem):
+            return False
+        publish_outputs(work_path, get_output_path(file_path, split_seconds), split_seconds)
+    except OSError:
+        discard_outputs(work_path, split_seconds)
+        raise
+    return True
+
+def _even(value):
+    return max(2, int(round(value / 2)) * 2)
+
+def build_video_filter(settings, crop=None):
+    """
+    -vf に渡すフィルタを返す（不要なら None）。
+    crop (w, h, x, y) があれば黒帯を切り抜き、指定解像度にはアスペクト比を保って収める。
+    """
+    has_size = settings['width'].isdigit() and settings['height'].isdigit()
+    if not crop:
+        return f"scale={settings['width']}:{settings['height']}" if has_size else None
+
+    crop_w, crop_h, crop_x, crop_y = crop
+    filters = [f"crop={crop_w}:{crop_h}:{crop_x}:{crop_y}"]
+    if has_size and int(settings['width']) > 0 and int(settings['height']) > 0:
+        ratio = min(int(settings['width']) / crop_w, int(settings['height']) / crop_h)
+        filters.append(f"scale={_even(crop_w * ratio)}:{_even(crop_h * ratio)}")
+    return ",".join(filters)
+
+def get_encode_args(settings, gpu_available):
+    """設定に基づくエンコード関連の ffmpeg 引数（コーデック・プリセット・スレッド・ビットレート）"""
+    codec_option = get_codec_option(settings['codec'], gpu_available)
+    threads = get_thread_count(settings['thread_count'])
+
+    args = [
+        '-c:v', codec_option,
+        '-preset', 'fast' if gpu_available else 'medium',
+        '-threads', str(threads),
+        '-c:a', 'aac', '-b:a', '192k'
+    ]
+
+    if settings['bitrate'] != "auto" and settings['bitrate'].isdigit():
+        args.extend(['-b:v', f"{settings['bitrate']}k"])
+    return args
+
+def build_command(file_path, settings, ffmpeg_path, gpu_available, crop=None, output_stem=None):
+    """1ファイル分の ffmpeg コマンドと出力先パスを返す（output_stem で出力のファイル名部分を変えられる）"""
+    split_seconds = get_split_seconds(settings)
+    output_path = get_output_path(file_path, split_seconds, output_stem)
+
+    command = [str(ffmpeg_path), '-y', '-i', str(file_path)]
+    command.extend(get_encode_args(settings, gpu_available))
+
+    video_filter = build_video_filter(settings, crop)
+    if video_filter:
+        command.extend(['-vf', video_filter])
+
+    if split_seconds:
+        command.extend([
+            '-f', 'segment',
+            '-segment_time', str(split_seconds),
+            '-reset_timestamps', '1'
+        ])
+
+    command.append(str(output_path))
+    return command, output_path
+
+def _parse_float(value):
+    try:
+        return float(value.rstrip('x'))
+    except (AttributeError, ValueError):
+        return None
+
+def run_ffmpeg(command, duration=None, on_progress=None):
+    """
+    ffmpeg を実行し、-progress の出力から on_progress(割合, fps, 速度) で進捗を通知する。
+    割合は duration（秒）が分かるときだけ 0〜1、分からなければ None。
+    失敗時は stderr 付きの subprocess.CalledProcessError を送出する。
+    """
+    command = [command[0], '-progress', 'pipe:1', '-nostats'] + command[1:]
+    # コンソールウィンドウを非表示で実行
+    process = subprocess.Popen(command, startupinfo=utils.hidden_startupinfo(),
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    # stderr を読み続けないとパイプが詰まって ffmpeg が止まるので別スレッドで受ける
+    stderr_chunks = []
+    stderr_thread = threading.Thread(target=lambda: stderr_chunks.append(process.stderr.read()), daemon=True)
+    stderr_thread.start()
+
+    values = {}
+    for raw_line in process.stdout:
+        key, _, value = raw_line.decode('utf-8', errors='ignore').strip().partition('=')
+        values[key] = value
+        if key != 'progress' or on_progress is None:
+            continue
+        out_time_us = values.get('out_time_us', '')
+        fraction = None
+        if duration and out_time_us.isdigit():
+            fraction = min(1.0, int(out_time_us) / 1_000_000 / duration)
+        on_progress(fraction, _parse_float(values.get('fps')), _parse_float(values.get('speed')))
+
+    process.wait()
+    stderr_thread.join()
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, command, stderr=b"".join(stderr_chunks))
+
+def report_progress(finished_count, total_files, start_time, progress_callback, eta_callback):
+    """完了（検証済み or 失敗確定）件数から進捗と ETA を GUI と状態サーバーに通知する"""
+    progress = (finished_count / total_files) * 100
+    progress_callback(progress)
+
+    elapsed_time = time.time() - start_time
+    avg_time_per_file = elapsed_time / finished_count
+    remaining_files = total_files - finished_count
+    eta_seconds = avg_time_per_file * remaining_files
+    eta_callback(format_time(eta_seconds))
+
+    status.BATCH.finished_count = finished_count
+    status.BATCH.eta_seconds = eta_seconds
+
+def _publish_queue(queue, verifying):
+    """変換待ち・検証中の一覧を状態サーバー用に差し替える"""
+    status.BATCH.queue = tuple(str(file_path) for file_path, _ in queue)
+    status.BATCH.verifying = tuple(str(file_path) for file_path, _, _, _ in verifying.values())
+
+def process_videos(paths, settings, ffmpeg_path, progress_callback, file_callback, eta_callback, complete_callback,
+                   cache_dir=None):
     """
     動画ファイルのリストを受け取り、設定に基づいて変換処理を行う。
+    変換後の出力はバックグラウンドで検証し、検証に通ったものだけを完了とする。
+    失敗したものはキューの末尾に戻して再変換する（MAX_RETRIES 回まで）。
+    cache_dir を渡すと、同じ内容・同じ設定の変換結果をキャッシュから再利用する。
     進捗はコールバック関数を通じてGUIに通知される。
     """
     files_to_process = get_valid_files(paths)
@@ -77,73 +319,183 @@ def process_videos(paths, settings, ffmpeg_path, progress_callback, file_callbac
     total_files = len(files_to_process)
     start_time = time.time()
     gpu_available = is_gpu_available()
+    ffprobe_path = probe.find_ffprobe(ffmpeg_path)
+    if ffprobe_path is None:
+        # 検証できないだけなので、従来どおり ffmpeg の終了コードで成功とみなす
+        print("[WARN] ffprobe が見つからないため、出力の検証を省略します。")
+        status.BATCH.emit("warning", message="ffprobe not found; output verification skipped")
+    split_seconds = get_split_seconds(settings)
+    cache = open_output_cache(cache_dir, settings)
+    options = get_output_options(settings, gpu_available)
 
-    for index, file_path in enumerate(files_to_process):
-        # --- GUI更新 (ファイル名) ---
-        file_callback(file_path.name)
-
-        # --- 出力先ディレクトリの作成 ---
-        output_dir = file_path.parent / "[MovieConverter]ResizedMovie"
-        output_dir.mkdir(exist_ok=True)
-
-        # --- ffmpegコマンドの構築 ---
-        codec_option = get_codec_option(settings['codec'], gpu_available)
-        threads = get_thread_count(settings['thread_count'])
-        
-        output_filename = file_path.stem + ".mp4"
-        if settings['split_seconds']:
-            # 分割する場合は連番をつける
-            output_filename = file_path.stem + "_%03d.mp4"
-        output_path = output_dir / output_filename
-
-        command = [
-            str(ffmpeg_path), '-y', '-i', str(file_path),
-            '-c:v', codec_option,
-            '-preset', 'fast' if gpu_available else 'medium',
-            '-threads', str(threads),
-            '-c:a', 'aac', '-b:a', '192k'
-        ]
-
-        if settings['bitrate'] != "auto" and settings['bitrate'].isdigit():
-            command.extend(['-b:v', f"{settings['bitrate']}k"])
-
-        if settings['width'].isdigit() and settings['height'].isdigit():
-            command.extend(['-vf', f"scale={settings['width']}:{settings['height']}"])
-            
-        if settings['split_seconds'] and settings['split_seconds'].isdigit():
-            split_duration = int(settings['split_seconds'])
-            command.extend([
-                '-f', 'segment',
-                '-segment_time', str(split_duration),
-                '-reset_timestamps', '1'
-            ])
-
-        command.append(str(output_path))
-        
-        # --- ffmpegの実行 ---
-        try:
-            # コンソールウィンドウを非表示で実行
-            si = subprocess.STARTUPINFO()
-            si.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-            si.wShowWindow = subprocess.SW_HIDE
-            subprocess.run(command, check=True, startupinfo=si, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            print(f"Successfully converted: {file_path.name}")
-        except subprocess.CalledProcessError as e:
-            print(f"Failed to convert {file_path.name}. Error: {e.stderr.decode('utf-8', errors='ignore')}")
-            # エラーが発生しても次のファイルへ
-            continue
-        finally:
-            # --- GUI更新 (進捗) ---
-            progress = ((index + 1) / total_files) * 100
-            progress_callback(progress)
-            
-            # --- GUI更新 (ETA) ---
-            elapsed_time = time.time() - start_time
-            avg_time_per_file = elapsed_time / (index + 1)
-            remaining_files = total_files - (index + 1)
-            eta_seconds = avg_time_per_file * remaining_files
-            eta_callback(format_time(eta_seconds))
+    queue = deque((file_path, 0) for file_path in files_to_process)
+    verifying = {}  # 検証中の future -> (file_path, 再試行回数, キャッシュキー, 一時的な出力先パス)
+    in_flight = {}  # 変換中のキャッシュキー -> 同じ内容で結果待ちのファイル
+    finished_count = 0
+    failed_files = []
+    encoder = get_codec_option(settings['codec'], gpu_available)
+    status.BATCH.start("convert", total_files, encoder, (str(file_path) for file_path in files_to_process))
+
+    with ThreadPoolExecutor(max_workers=VERIFY_WORKERS) as verify_pool:
+        while queue or verifying:
+            # --- 検証結果の回収（変換待ちが無ければ検証の完了を待つ） ---
+            if queue:
+                done = [future for future in verifying if future.done()]
+            else:
+                done, _ = wait(verifying, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                file_path, attempt, cache_key, work_path = verifying.pop(future)
+                try:
+                    result, reason = future.result()
+                except Exception as e:
+                    result, reason = verifier.UNVERIFIED, str(e)
+
+                if result != verifier.BROKEN:
+                    try:
+                        publish_outputs(work_path, get_output_path(file_path, split_seconds), split_seconds)
+                    except OSError as e:
+                        # 古い出力が開かれている等。そのファイルだけ失敗にして続ける
+                        print(f"Failed to save output of {file_path.name}: {e}")
+                        discard_outputs(work_path, split_seconds)
+                        failed_files.append(file_path)
+                        status.BATCH.fail(str(file_path), f"出力を保存できません: {e}")
+                        queue.extend((waiting_path, 0) for waiting_path in in_flight.pop(cache_key, []))
+                        finished_count += 1
+                        report_progress(finished_count, total_files, start_time, progress_callback, eta_callback)
+                        continue
+                    if result == verifier.VERIFIED or ffprobe_path is None:
+                        print(f"Successfully converted: {file_path.name}")
+                    else:
+                        print(f"Converted without verification: {file_path.name} ({reason})")
+                    status.BATCH.emit("file_verified" if result == verifier.VERIFIED else "file_converted",
+                                      file=str(file_path))
+                    # 同じ内容で待っていたファイルはキャッシュから複製する
+                    for waiting_path in in_flight.pop(cache_key, []):
+                        try:
+                            restored = restore_outputs(cache, cache_key, waiting_path, split_seconds)
+                        except OSError as e:
+                            print(f"Failed to restore {waiting_path.name} from cache: {e}")
+                            failed_files.append(waiting_path)
+                            status.BATCH.fail(str(waiting_path), f"キャッシュから出力を作れません: {e}")
+                            finished_count += 1
+                            continue
+                        if restored:
+                            print(f"Restored from cache: {waiting_path.name}")
+                            status.BATCH.emit("file_restored", file=str(waiting_path))
+                            finished_count += 1
+                        else:
+                            # キャッシュ登録に失敗していたら自前で変換する
+                            queue.append((waiting_path, 0))
+                elif attempt < MAX_RETRIES:
+                    print(f"Verification failed for {file_path.name}: {reason} (re-queued)")
+                    discard_outputs(work_path, split_seconds)
+                    status.BATCH.emit("file_requeued", file=str(file_path), reason=reason)
+                    queue.append((file_path, attempt + 1))
+                    continue
+                else:
+                    print(f"Verification failed for {file_path.name}: {reason}")
+                    discard_outputs(work_path, split_seconds)
+                    failed_files.append(file_path)
+                    status.BATCH.fail(str(file_path), reason)
+                    # 待っていたファイルは自前で変換し直す
+                    queue.extend((waiting_path, 0) for waiting_path in in_flight.pop(cache_key, []))
+
+                # --- GUI更新 (進捗・ETA) ---
+                finished_count += 1
+                report_progress(finished_count, total_files, start_time, progress_callback, eta_callback)
+
+            if not queue:
+                _publish_queue(queue, verifying)
+                continue
+            file_path, attempt = queue.popleft()
+            _publish_queue(queue, verifying)
+
+            # --- GUI更新 (ファイル名) ---
+            file_callback(file_path.name)
+
+            # --- 出力先ディレクトリの作成 ---
+            output_dir = file_path.parent / OUTPUT_DIR_NAME
+            output_dir.mkdir(exist_ok=True)
+
+
+            # --- 出力キャッシュの確認（同じ内容・同じ設定なら変換しない） ---
+            cache_key = cache.make_key(file_path, options) if cache else None
+            if cache_key and attempt == 0:
+                if cache_key in in_flight:
+                    # 同じ内容を変換中なので、その結果を待つ
+                    in_flight[cache_key].append(file_path)
+                    continue
+                try:
+                    restored = restore_outputs(cache, cache_key, file_path, split_seconds)
+                except OSError as e:
+                    print(f"Failed to restore {file_path.name} from cache: {e}")
+                    failed_files.append(file_path)
+                    status.BATCH.fail(str(file_path), f"キャッシュから出力を作れません: {e}")
+                    finished_count += 1
+                    report_progress(finished_count, total_files, start_time, progress_callback, eta_callback)
+                    continue
+                if restored:
+                    print(f"Restored from cache: {file_path.name}")
+                    status.BATCH.emit("file_restored", file=str(file_path))
+                    finished_count += 1
+                    report_progress(finished_count, total_files, start_time, progress_callback, eta_callback)
+                    continue
+            if cache_key:
+                in_flight.setdefault(cache_key, [])
+
+            # --- 黒帯の検出（変換するときだけ。結果は解析キャッシュに残る） ---
+            crop = probe.detect_crop(ffmpeg_path, ffprobe_path, file_path) if is_auto_crop(settings) else None
+            if crop:
+                print(f"Detected crop for {file_path.name}: {crop}")
+
+            # --- ffmpegコマンドの構築（検証が終わるまでは一時的な名前に書き出す） ---
+            command, work_path = build_command(file_path, settings, ffmpeg_path, gpu_available, crop,
+                                               get_work_stem(file_path))
+
+            # --- ffmpegの実行 ---
+            source_info = probe.probe_media(ffprobe_path, file_path)
+            duration = probe.media_duration(source_info) if source_info else None
+            current = {"file": str(file_path), "attempt": attempt, "encoder": encoder,
+                       "progress": 0.0, "fps": None, "speed": None}
+            status.BATCH.current = current
+            status.BATCH.emit("file_started", file=str(file_path), attempt=attempt)
+
+            def on_progress(fraction, fps, speed):
+                # 状態は辞書ごと差し替える（読む側がロック無しで一貫した値を見られるように）。
+                # 進捗は頻繁なので /events の履歴には積まず、/status の current で見せる
+                status.BATCH.current = {**current, "progress": fraction, "fps": fps, "speed": speed}
+                if fraction is not None:
+                    progress_callback((finished_count + fraction) / total_files * 100)
+
+            try:
+                run_ffmpeg(command, duration, on_progress)
+            except subprocess.CalledProcessError as e:
+                error = e.stderr.decode('utf-8', errors='ignore')
+                print(f"Failed to convert {file_path.name}. Error: {error}")
+                discard_outputs(work_path, split_seconds)
+                # エラーが発生しても次のファイルへ
+                failed_files.append(file_path)
+                status.BATCH.fail(str(file_path), error.strip().splitlines()[-1] if error.strip() else str(e))
+                queue.extend((waiting_path, 0) for waiting_path in in_flight.pop(cache_key, []))
+                finished_count += 1
+                report_progress(finished_count, total_files, start_time, progress_callback, eta_callback)
+                continue
+            finally:
+                status.BATCH.current = None
+
+            # --- 出力の検証とキャッシュ登録（次の変換を待たせないようバックグラウンドで） ---
+            future = verify_pool.submit(_verify_and_cache, cache, cache_key, ffprobe_path,
+                                        file_path, work_path, split_seconds)
+            verifying[future] = (file_path, attempt, cache_key, work_path)
 
     # --- 変換完了処理 ---
     winsound.Beep(1000, 500)
-    complete_callback("すべての動画の変換が完了しました！")
\ No newline at end of file
+    if failed_files:
+        message = f"変換が完了しました。（失敗: {len(failed_files)}件）"
+    else:
+        message = "すべての動画の変換が完了しました！"
+    if ffprobe_path is None:
+        message += "\n（ffprobe が見つからないため、出力の検証は行っていません）"
+    status.BATCH.finish(message)
+    complete_callback(message)
@@ -0,0 +1,173 @@
+import itertools
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+EVENT_HISTORY = 500      # /events で遡れるイベント数（進捗は積まず、開始・完了・失敗などだけ）
+RECENT_FAILURES = 20     # /status に載せる直近の失敗数
+EVENT_POLL_SEC = 0.5     # /events の新着確認間隔
+HEARTBEAT_SEC = 15       # /events の接続維持用コメント送信間隔
+
+
+class BatchStatus:
+    """
+    実行中バッチの状態。変換スレッドが書き込み、状態サーバーが読む。
+    変換処理を止めないようロックは使わず、属性は丸ごと差し替え（GILで原子的）、
+    履歴は maxlen 付き deque への append だけで更新する。
+    """
+
+    def __init__(self):
+        self._seq = itertools.count(1)
+        self.events = deque(maxlen=EVENT_HISTORY)
+        self.recent_failures = deque(maxlen=RECENT_FAILURES)
+        self.running = False
+        self.mode = ""
+        self.encoder = ""
+        self.started_at = None
+        self.total_files = 0
+        self.finished_count = 0
+        self.failed_count = 0
+        self.eta_seconds = None
+        self.queue = ()
+        self.verifying = ()
+        self.current = None
+
+    def start(self, mode, total_files, encoder, queue):
+        self.running = True
+        self.mode = mode
+        self.encoder = encoder
+        self.started_at = time.time()
+        self.total_files = total_files
+        self.finished_count = 0
+        self.failed_count = 0
+        self.eta_seconds = None
+        self.queue = tuple(queue)
+        self.verifying = ()
+        self.current = None
+        self.emit("batch_started", mode=mode, total_files=total_files, encoder=encoder)
+
+    def finish(self, message):
+        self.running = False
+        self.current = None
+        self.queue = ()
+        self.verifying = ()
+        self.eta_seconds = 0
+        self.emit("batch_completed", message=message, failed=self.failed_count)
+
+    def fail(self, file_name, reason):
+        self.failed_count += 1
+        failure = {"time": time.time(), "file": file_name, "reason": reason}
+        self.recent_failures.append(failure)
+        self.emit("file_failed", file=file_name, reason=reason)
+
+    def emit(self, event_type, **data):
+        self.events.append({"seq": next(self._seq), "time": time.time(), "type": event_type, **data})
+
+    def events_since(self, seq):
+        # tuple() は GIL を保持したまま複製するので、書き込みと競合しない
+        return [event for event in tuple(self.events) if event["seq"] > seq]
+
+    def snapshot(self):
+        return {
+            "running": self.running,
+            "mode": self.mode,
+            "encoder": self.encoder,
+            "started_at": self.started_at,
+            "total_files": self.total_files,
+            "finished_count": self.finished_count,
+            "failed_count": self.failed_count,
+            "eta_seconds": self.eta_seconds,
+            "queue": list(self.queue),
+            "verifying": list(self.verifying),
+            "current": self.current,
+            "recent_failures": list(tuple(self.recent_failures)),
+        }
+
+
+# 変換処理と状態サーバーが共有するインスタンス
+BATCH = BatchStatus()
+
+
+class _StatusHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass  # アクセスログは出さない
+
+    def _send_json(self, code, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/status":
+            self._send_json(200, BATCH.snapshot())
+        elif url.path == "/events":
+            self._stream_events(url)
+        else:
+            self._send_json(404, {"error": "not found", "endpoints": ["/status", "/events"]})
+
+    def _stream_events(self, url):
+        """Server-Sent Events でイベントを流す（?since=番号 または Last-Event-ID から再開）"""
+        since = parse_qs(url.query).get("since", [self.headers.get("Last-Event-ID", "0")])[0]
+        last_seq = int(since) if since.isdigit() else 0
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+
+        last_write = time.time()
+        try:
+            # stop_server() で止められたら、接続中のストリームも抜ける
+            while not self.server.stopping.is_set():
+                for event in BATCH.events_since(last_seq):
+                    data = json.dumps(event, ensure_ascii=False)
+                    self.wfile.write(f"id: {event['seq']}\nevent: {event['type']}\ndata: {data}\n\n".encode('utf-8'))
+                    last_seq = event["seq"]
+                    last_write = time.time()
+                if time.time() - last_write >= HEARTBEAT_SEC:
+                    self.wfile.write(b": keep-alive\n\n")
+                    last_write = time.time()
+                self.wfile.flush()
+                self.server.stopping.wait(EVENT_POLL_SEC)
+        except (BrokenPipeError, ConnectionResetError, ConnectionAbortedError):
+            pass
+
+
+_server = None
+
+
+def start_server(port):
+    """127.0.0.1:port で状態サーバーを起動する（既に同じポートで動いていれば何もしない）"""
+    global _server
+    if _server is not None:
+        if _server.server_address[1] == port:
+            return True
+        stop_server()
+    try:
+        _server = ThreadingHTTPServer(("127.0.0.1", port), _StatusHandler)
+    except OSError as e:
+        print(f"状態サーバーを起動できませんでした (port {port}): {e}")
+        _server = None
+        return False
+    _server.daemon_threads = True
+    _server.stopping = threading.Event()
+    threading.Thread(target=_server.serve_forever, daemon=True).start()
+    print(f"Status server listening on http://127.0.0.1:{port}/status")
+    return True
+
+
+def stop_server():
+    """状態サーバーを停止する"""
+    global _server
+    if _server is not None:
+        _server.stopping.set()
+        _server.shutdown()
+        _server.server_close()
+        _server = None
@@ -2,8 +2,9 @@ import sys
 import os
 from pathlib import Path
 import shutil
+import subprocess
 
-_WHITELIST_COPY = {"ffmpeg.exe"}  # 展開許可ファイル
+_WHITELIST_COPY = {"ffmpeg.exe", "ffprobe.exe"}  # 展開許可ファイル
 
 def get_resource_path(relative_path: str, extraction_dir: Path) -> Path | None:
     """
@@ -16,7 +17,7 @@ def get_resource_path(relative_path: str, extraction_dir: Path) -> Path | None:
         source_path = bundle_dir / relative_path
         dest_path = extraction_dir / relative_path
 
-        # ▼ ホワイトリストにあるものだけコピー（ffmpeg.exe）
+        # ▼ ホワイトリストにあるものだけコピー（ffmpeg.exe / ffprobe.exe）
         if relative_path.lower() in _WHITELIST_COPY and source_path.exists():
             if not dest_path.exists():
                 try:
@@ -35,3 +36,11 @@ def get_resource_path(relative_path: str, extraction_dir: Path) -> Path | None:
     base_path = Path(os.path.abspath("."))
     candidate = base_path / relative_path
     return candidate if candidate.exists() else None
+
+
+def hidden_startupinfo():
+    """コンソールウィンドウを非表示にする STARTUPINFO を返す（外部コマンド実行用）"""
+    si = subprocess.STARTUPINFO()
+    si.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+    si.wShowWindow = subprocess.SW_HIDE
+    return si
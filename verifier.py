@@ -0,0 +1,142 @@
+import glob
+import math
+import re
+from pathlib import Path
+
+import probe
+
+# 元動画との長さの許容誤差（音声のプライミング等で多少ずれるため）
+DURATION_TOLERANCE_SEC = 1.0
+DURATION_TOLERANCE_RATIO = 0.01
+
+# 検証結果。再変換の対象にするのは BROKEN（出力が壊れている）だけ
+VERIFIED = "verified"
+BROKEN = "broken"
+UNVERIFIED = "unverified"  # ffprobe が無い・元動画を解析できない等、道具側の理由で検証できなかった
+
+
+def _tolerance(duration):
+    return max(DURATION_TOLERANCE_SEC, duration * DURATION_TOLERANCE_RATIO)
+
+
+def segment_paths(output_dir, stem):
+    """分割出力（stem_000.mp4, stem_001.mp4, ...）を番号順に返す"""
+    pattern = f"{glob.escape(stem)}_[0-9][0-9][0-9].mp4"
+    return sorted(Path(output_dir).glob(pattern))
+
+
+def _probe_output(ffprobe_path, output_path):
+    """
+    出力ファイル1本を解析し、(種類ごとの長さ dict, エラー理由) を返す。
+    moov が書かれず途中で切れた mp4 などは ffprobe がここで失敗する
+    （ffprobe 自体があることは呼び出し側で確認済みなので、失敗は出力の問題とみなす）。
+    """
+    if not output_path.exists() or output_path.stat().st_size == 0:
+        return None, f"{output_path.name} がありません"
+
+    # 出力は検証のたびに変わるのでキャッシュしない
+    info = probe.probe_media(ffprobe_path, output_path, use_cache=False)
+    if info is None:
+        return None, f"{output_path.name} を解析できません"
+
+    format_names = info.get("format", {}).get("format_name", "").split(",")
+    if "mp4" not in format_names:
+        return None, f"{output_path.name} が MP4 ではありません"
+
+    durations = {}
+    for codec_type, stream in probe.main_streams(info).items():
+        duration = probe.stream_duration(stream, info)
+        if not duration:
+            return None, f"{output_path.name} の{codec_type}ストリームが空です"
+        durations[codec_type] = duration
+    return durations, None
+
+
+def _expected_durations(source_info):
+    """元動画の映像・音声それぞれの長さ"""
+    return {
+        codec_type: probe.stream_duration(stream, source_info)
+        for codec_type, stream in probe.main_streams(source_info).items()
+    }
+
+
+def _compare_durations(expected, actual):
+    """元動画と出力のストリーム構成・長さを比べる。問題なければ None"""
+    for codec_type, expected_duration in expected.items():
+        if codec_type not in actual:
+            return f"{codec_type}ストリームがありません"
+        if expected_duration is None:
+            continue
+        if abs(actual[codec_type] - expected_duration) > _tolerance(expected_duration):
+            return (f"{codec_type}の長さが一致しません "
+                    f"(元: {expected_duration:.2f}s / 出力: {actual[codec_type]:.2f}s)")
+    return None
+
+
+def _result(error):
+    return (BROKEN, error) if error else (VERIFIED, "")
+
+
+def verify_output(ffprobe_path, source_path, output_path, split_seconds=None):
+    """
+    変換結果を検証して (VERIFIED / BROKEN / UNVERIFIED, 理由) を返す。
+    split_seconds 指定時の output_path は連番パターン（stem_%03d.mp4）。
+    どちらもヘッダ/インデックスの読み取りだけで判定し、フルデコードはしない。
+    """
+    if not ffprobe_path:
+        return UNVERIFIED, "ffprobe が見つかりません"
+    try:
+        source_info = probe.probe_media(ffprobe_path, source_path)
+        if source_info is None:
+            return UNVERIFIED, "元動画を解析できません"
+        expected = _expected_durations(source_info)
+        output_path = Path(output_path)
+
+        if not split_seconds:
+            actual, error = _probe_output(ffprobe_path, output_path)
+            if error:
+                return BROKEN, error
+            return _result(_compare_durations(expected, actual))
+
+        # --- 分割出力: 連番の抜け・本数・合計の長さを確認 ---
+        stem = re.sub(r"_%03d$", "", output_path.stem)
+        segments = segment_paths(output_path.parent, stem)
+        if not segments:
+            return BROKEN, "分割ファイルがありません"
+        for index, segment in enumerate(segments):
+            if segment.name != f"{stem}_{index:03d}.mp4":
+                return BROKEN, f"分割ファイルの連番が抜けています ({index:03d})"
+
+        # 分割はキーフレーム位置で行われるので、本数は想定より少なくなることはあっても多くはならない
+        source_duration = probe.media_duration(source_info)
+        if source_duration:
+            expected_count = max(1, math.ceil(source_duration / split_seconds))
+            if len(segments) > expected_count + 1:
+                return BROKEN, f"分割数が多すぎます (想定: {expected_count} / 実際: {len(segments)})"
+
+        totals = {}
+        for segment in segments:
+            actual, error = _probe_output(ffprobe_path, segment)
+            if error:
+                return BROKEN, error
+            for codec_type, duration in actual.items():
+                totals[codec_type] = totals.get(codec_type, 0.0) + duration
+        return _result(_compare_durations(expected, totals))
+    except Exception as e:
+        return UNVERIFIED, f"検証中にエラーが発生しました: {e}"
+
+
+def verify_joined(ffprobe_path, expected_durations, output_path):
+    """
+    結合結果を検証して (VERIFIED / BROKEN / UNVERIFIED, 理由) を返す。
+    expected_durations は映像・音声それぞれの想定の長さ（結合した各クリップの合計）。
+    """
+    if not ffprobe_path:
+        return UNVERIFIED, "ffprobe が見つかりません"
+    try:
+        actual, error = _probe_output(ffprobe_path, Path(output_path))
+        if error:
+            return BROKEN, error
+        return _result(_compare_durations(expected_durations, actual))
+    except Exception as e:
+        return UNVERIFIED, f"検証中にエラーが発生しました: {e}"